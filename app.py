@@ -1,14 +1,119 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify
+import atexit
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import (
+    Flask,
+    Response,
+    abort,
+    render_template,
+    request,
+    redirect,
+    url_for,
+    jsonify,
+    stream_with_context,
+)
 from flask_sqlalchemy import SQLAlchemy
+from markupsafe import Markup
+from sqlalchemy import delete, event, func, insert, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from cache import LRUCache
+from events import ChangeBroadcaster, event_stream
+from engine_profile import (
+    DEFAULT_SQLITE_PRAGMAS,
+    RoutingSession,
+    init_engine_profile,
+    reader_engine,
+)
+from metrics import Instrumentation
+from reaper import Reaper
+from search import create_search_index, search
+from timelog import HeartbeatBuffer
 
 app = Flask(__name__)
 
 # Configure the SQLite database
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///project_tracker.db"
+app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get(
+    "DATABASE_URL", "sqlite:///project_tracker.db"
+)
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
+# Engine profile: SQLite allows a single writer, so the writer pool stays small
+# while read-only requests get their own, larger pool
+# (in-memory SQLite shares one connection, so the pool options are skipped there)
+app.config["SQLITE_PRAGMAS"] = dict(DEFAULT_SQLITE_PRAGMAS)
+app.config["WRITER_ENGINE_OPTIONS"] = {
+    "pool_size": 1,
+    "max_overflow": 4,
+    "pool_timeout": 30,
+}
+app.config["READER_ENGINE_OPTIONS"] = {
+    "pool_size": 8,
+    "max_overflow": 8,
+    "pool_timeout": 30,
+}
+
+# Task listing page sizes for /project_tasks
+app.config["TASKS_PAGE_SIZE"] = 500
+app.config["TASKS_MAX_PAGE_SIZE"] = 5000
+
+# Largest number of rows accepted by /add_tasks and /add_projects
+app.config["MAX_BATCH_SIZE"] = 1000
+
+# Rendered dashboard fragments are cached in-process for this many seconds
+app.config["DASHBOARD_CACHE_TTL"] = 30
+app.config["DASHBOARD_CACHE_SIZE"] = 128
+
+# Result page sizes for /search
+app.config["SEARCH_PAGE_SIZE"] = 20
+app.config["SEARCH_MAX_PAGE_SIZE"] = 100
+
+# Seconds between batched writes of buffered timer heartbeats
+app.config["HEARTBEAT_FLUSH_INTERVAL"] = 10
+
+# Most seconds logged for a timer interval with no heartbeat to confirm it,
+# e.g. after the tab running the timer was closed (main.js beats every 15s)
+app.config["TIMER_MAX_UNCONFIRMED"] = 60
+
+# Deleting a project either hides it at once and lets the background reaper
+# remove its rows in chunks ("soft"), or removes everything in the request ("bulk")
+app.config["PROJECT_DELETE_MODE"] = "soft"
+app.config["REAPER_CHUNK_SIZE"] = 1000
+app.config["REAPER_PAUSE"] = 0.05
+app.config["REAPER_INTERVAL"] = 5
+
+# Change feed: seconds between polls of the change log and the most missed
+# changes a reconnecting /events client may replay before it must reload
+app.config["EVENTS_POLL_INTERVAL"] = 1.0
+app.config["EVENTS_BACKFILL_LIMIT"] = 1000
+
+# Only the newest changes are kept; older ones are swept at most every
+# EVENTS_PRUNE_INTERVAL seconds by the requests that write changes
+app.config["EVENTS_RETAIN_CHANGES"] = 2000
+app.config["EVENTS_PRUNE_INTERVAL"] = 60
+
+# Instrumentation: fraction of requests measured, whether to add
+# X-Query-Count/Server-Timing headers, and the slow query log threshold
+app.config["METRICS_ENABLED"] = True
+app.config["METRICS_SAMPLE_RATE"] = 1.0
+app.config["METRICS_TIMING_HEADERS"] = False
+app.config["SLOW_QUERY_THRESHOLD"] = 0.1
+
 # Initialize the database
-db = SQLAlchemy(app)
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+init_engine_profile(app, db)
+
+# Record request latency and SQL usage for /metrics
+with app.app_context():
+    instrumentation = Instrumentation(app, engines=[db.engine, reader_engine()])
+
+# Cache for rendered dashboard fragments
+fragment_cache = LRUCache(
+    maxsize=app.config["DASHBOARD_CACHE_SIZE"], ttl=app.config["DASHBOARD_CACHE_TTL"]
+)
 
 
 # Define the Project model
@@ -16,6 +121,8 @@ class Project(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(80), nullable=False)
     description = db.Column(db.String(200))
+    # Set when the project is soft-deleted; the reaper removes it later
+    deleted_at = db.Column(db.DateTime, index=True)
 
 
 # Define the Task model
@@ -23,8 +130,84 @@ class Task(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(80), nullable=False)
     description = db.Column(db.String(200))
-    project_id = db.Column(db.Integer, db.ForeignKey("project.id"), nullable=False)
-    project = db.relationship("Project", backref=db.backref("tasks", lazy=True))
+    project_id = db.Column(
+        db.Integer, db.ForeignKey("project.id", ondelete="CASCADE"), nullable=False
+    )
+    project = db.relationship(
+        "Project", backref=db.backref("tasks", lazy=True, passive_deletes=True)
+    )
+
+    # Keyset pagination walks a project's tasks in id order
+    __table_args__ = (db.Index("ix_task_project_id_id", "project_id", "id"),)
+
+
+# Define the TimeEntry model: an append-only log of tracked intervals
+class TimeEntry(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    task_id = db.Column(
+        db.Integer,
+        db.ForeignKey("task.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    project_id = db.Column(
+        db.Integer,
+        db.ForeignKey("project.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    started_at = db.Column(db.DateTime, nullable=False)
+    ended_at = db.Column(db.DateTime, nullable=False)
+    seconds = db.Column(db.Integer, nullable=False)
+
+
+# Define the ActiveTimer model: one row per running timer, holding the point
+# up to which its time has already been logged
+class ActiveTimer(db.Model):
+    task_id = db.Column(
+        db.Integer, db.ForeignKey("task.id", ondelete="CASCADE"), primary_key=True
+    )
+    project_id = db.Column(
+        db.Integer, db.ForeignKey("project.id", ondelete="CASCADE"), nullable=False
+    )
+    logged_until = db.Column(db.DateTime, nullable=False)
+
+
+# Rollups of logged seconds, updated as entries are appended
+class TaskTimeTotal(db.Model):
+    task_id = db.Column(
+        db.Integer, db.ForeignKey("task.id", ondelete="CASCADE"), primary_key=True
+    )
+    seconds = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ProjectTimeTotal(db.Model):
+    project_id = db.Column(
+        db.Integer, db.ForeignKey("project.id", ondelete="CASCADE"), primary_key=True
+    )
+    seconds = db.Column(db.Integer, nullable=False, default=0)
+
+
+# Define the Change model: a monotonic log of writes, replayed by /events
+class Change(db.Model):
+    # AUTOINCREMENT keeps sequence numbers from ever being reused
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(40), nullable=False)
+    project_id = db.Column(db.Integer, nullable=False)
+    payload = db.Column(db.JSON, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+
+# Create the full-text search index alongside the tables
+@event.listens_for(db.metadata, "after_create")
+def create_search_tables(target, connection, **kw):
+    create_search_index(connection)
+
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
 
 @app.route("/")
@@ -32,10 +215,62 @@ def index():
     return render_template("index.html")
 
 
+def project_summaries():
+    """Return id, name, description and task count for every project in one query."""
+    project = Project.__table__
+    task = Task.__table__
+    return db.session.execute(
+        select(
+            project.c.id,
+            project.c.name,
+            project.c.description,
+            func.count(task.c.id).label("task_count"),
+        )
+        .select_from(project.outerjoin(task, task.c.project_id == project.c.id))
+        .where(project.c.deleted_at.is_(None))
+        .group_by(project.c.id)
+        .order_by(project.c.id)
+    ).all()
+
+
+def latest_change_seq():
+    return db.session.scalar(select(func.max(Change.__table__.c.seq))) or 0
+
+
+def render_project_list():
+    """Render the sidebar project list, serving it from the cache when possible.
+
+    Returns the HTML and the change sequence number it is current as of, so
+    the page can pick up the /events feed from that point.
+    """
+    cached = fragment_cache.get("project_list")
+    if cached is None:
+        # A write that invalidates while we render must not be overwritten
+        # by this now-stale render
+        generation = fragment_cache.generation()
+        change_seq = latest_change_seq()
+        html = render_template("project_list.html", projects=project_summaries())
+        cached = (html, change_seq)
+        fragment_cache.set("project_list", cached, generation=generation)
+    html, change_seq = cached
+    return Markup(html), change_seq
+
+
+def invalidate_project_list():
+    fragment_cache.delete("project_list")
+
+
 @app.route("/dashboard")
 def dashboard():
-    projects = Project.query.all()
-    return render_template("dashboard.html", projects=projects)
+    project_list, change_seq = render_project_list()
+    return render_template(
+        "dashboard.html", project_list=project_list, change_seq=change_seq
+    )
+
+
+@app.route("/metrics")
+def metrics():
+    return Response(instrumentation.render(), mimetype="text/plain; version=0.0.4")
 
 
 @app.route("/login")
@@ -53,15 +288,176 @@ def logout():
     return redirect(url_for("index"))
 
 
+def project_tasks_etag(project_id):
+    """Fingerprint a project's task list, or return None if it doesn't exist.
+
+    Tasks are only ever appended or removed along with their project, so the
+    task count and highest id identify the list. Both come straight off the
+    (project_id, id) index without loading any ORM objects.
+    """
+    task = Task.__table__
+    project = Project.__table__
+    row = db.session.execute(
+        select(project.c.id, func.count(task.c.id), func.max(task.c.id))
+        .select_from(project.outerjoin(task, task.c.project_id == project.c.id))
+        .where(project.c.id == project_id, project.c.deleted_at.is_(None))
+        .group_by(project.c.id)
+    ).first()
+    if row is None:
+        return None
+    return f"{project_id}-{row[1]}-{row[2] or 0}"
+
+
+def stream_project_tasks(project_id):
+    """Yield every task of a project as NDJSON, straight from the cursor."""
+    task = Task.__table__
+    query = (
+        select(task.c.id, task.c.name, task.c.description)
+        .where(task.c.project_id == project_id)
+        .order_by(task.c.id)
+    )
+    with reader_engine().connect() as connection:
+        result = connection.execution_options(
+            stream_results=True, yield_per=1000
+        ).execute(query)
+        for row in result:
+            yield json.dumps(dict(row._mapping)) + "\n"
+
+
 @app.route("/project_tasks/<int:project_id>")
 def project_tasks(project_id):
-    project = Project.query.get_or_404(project_id)
-    tasks = Task.query.filter_by(project_id=project_id).all()
-    tasks_data = [
-        {"id": task.id, "name": task.name, "description": task.description}
-        for task in tasks
-    ]
-    return jsonify({"tasks": tasks_data})
+    etag = project_tasks_etag(project_id)
+    if etag is None:
+        abort(404)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    if request.args.get("format") == "ndjson":
+        response = Response(
+            stream_with_context(stream_project_tasks(project_id)),
+            mimetype="application/x-ndjson",
+        )
+        response.set_etag(etag)
+        return response
+
+    limit = request.args.get("limit", app.config["TASKS_PAGE_SIZE"], type=int)
+    limit = max(1, min(limit, app.config["TASKS_MAX_PAGE_SIZE"]))
+    after = request.args.get("after", 0, type=int)
+
+    task = Task.__table__
+    rows = db.session.execute(
+        select(task.c.id, task.c.name, task.c.description)
+        .where(task.c.project_id == project_id, task.c.id > after)
+        .order_by(task.c.id)
+        .limit(limit + 1)
+    ).all()
+    tasks_data = [dict(row._mapping) for row in rows[:limit]]
+    next_after = tasks_data[-1]["id"] if len(rows) > limit else None
+
+    response = jsonify({"tasks": tasks_data, "next_after": next_after})
+    response.set_etag(etag)
+    return response
+
+
+@app.route("/search")
+def search_projects_and_tasks():
+    query = request.args.get("q", "")
+    limit = request.args.get("limit", app.config["SEARCH_PAGE_SIZE"], type=int)
+    limit = max(1, min(limit, app.config["SEARCH_MAX_PAGE_SIZE"]))
+    offset = max(0, request.args.get("offset", 0, type=int))
+    results = search(db.session.connection(), query, limit + 1, offset)
+    next_offset = offset + limit if len(results) > limit else None
+    return jsonify({"results": results[:limit], "next_offset": next_offset})
+
+
+def record_changes(kind, changes):
+    """Append ``(project_id, payload)`` changes to the change log.
+
+    Runs in the caller's transaction, so a change is visible exactly when
+    the write it describes is.
+    """
+    now = utcnow()
+    db.session.execute(
+        insert(Change.__table__),
+        [
+            {
+                "kind": kind,
+                "project_id": project_id,
+                "payload": payload,
+                "created_at": now,
+            }
+            for project_id, payload in changes
+        ],
+    )
+
+
+def fetch_changes(since, limit):
+    """Return changes after ``since`` as (seq, kind, payload) tuples.
+
+    With ``since`` None, return the latest sequence number instead.
+    """
+    change = Change.__table__
+    with app.app_context(), reader_engine().connect() as connection:
+        if since is None:
+            return connection.scalar(select(func.max(change.c.seq))) or 0
+        return [
+            tuple(row)
+            for row in connection.execute(
+                select(change.c.seq, change.c.kind, change.c.payload)
+                .where(change.c.seq > since)
+                .order_by(change.c.seq)
+                .limit(limit)
+            )
+        ]
+
+
+broadcaster = ChangeBroadcaster(
+    fetch_changes, interval=app.config["EVENTS_POLL_INTERVAL"]
+)
+
+
+last_prune = 0.0
+
+
+def prune_changes():
+    """Delete change-log rows too old for any client to replay."""
+    global last_prune
+    now = time.monotonic()
+    if now - last_prune < app.config["EVENTS_PRUNE_INTERVAL"]:
+        return
+    last_prune = now
+    change = Change.__table__
+    oldest_kept = select(
+        func.max(change.c.seq) - app.config["EVENTS_RETAIN_CHANGES"]
+    ).scalar_subquery()
+    db.session.execute(delete(change).where(change.c.seq <= oldest_kept))
+    db.session.commit()
+
+
+def changes_committed():
+    invalidate_project_list()
+    broadcaster.notify()
+    prune_changes()
+
+
+# Every open dashboard holds its /events stream, and the worker serving it, for
+# as long as it stays open. Serve the app with threaded or async workers, e.g.
+# "gunicorn -k gthread --threads 64 app:app" or "-k gevent"; with sync workers
+# each dashboard would take a whole worker process
+@app.route("/events")
+def events():
+    since = request.headers.get("Last-Event-ID", type=int)
+    if since is None:
+        since = request.args.get("since", type=int)
+    if since is None:
+        since = broadcaster.fetch_since(None, 0)
+    return Response(
+        event_stream(broadcaster, since, app.config["EVENTS_BACKFILL_LIMIT"]),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.route("/add_project", methods=["POST"])
@@ -71,7 +467,22 @@ def add_project():
     project_description = data["project-description"]
     new_project = Project(name=project_name, description=project_description)
     db.session.add(new_project)
+    db.session.flush()
+    record_changes(
+        "project_added",
+        [
+            (
+                new_project.id,
+                {
+                    "id": new_project.id,
+                    "name": project_name,
+                    "description": project_description,
+                },
+            )
+        ],
+    )
     db.session.commit()
+    changes_committed()
     return jsonify({"success": True, "project_id": new_project.id})
 
 
@@ -80,18 +491,455 @@ def add_task():
     data = request.get_json()
     task_name = data["task-name"]
     task_description = data["task-description"]
-    project_id = data["project-id"]
+    try:
+        project_id = int(data["project-id"])
+    except (TypeError, ValueError):
+        return (
+            jsonify({"success": False, "error": "project-id must be an integer"}),
+            400,
+        )
+    # Foreign keys are enforced, and soft-deleted projects take no new tasks
+    project = Project.__table__
+    live = db.session.scalar(
+        select(project.c.id).where(
+            project.c.id == project_id, project.c.deleted_at.is_(None)
+        )
+    )
+    if live is None:
+        abort(404)
     new_task = Task(name=task_name, description=task_description, project_id=project_id)
     db.session.add(new_task)
+    db.session.flush()
+    record_changes(
+        "task_added",
+        [
+            (
+                project_id,
+                {
+                    "id": new_task.id,
+                    "project_id": project_id,
+                    "name": task_name,
+                    "description": task_description,
+                },
+            )
+        ],
+    )
     db.session.commit()
+    changes_committed()
     return jsonify({"success": True, "task_id": new_task.id})
 
 
+def read_batch(key):
+    """Return the list of rows posted to a bulk endpoint.
+
+    Accepts a JSON array, an object holding the array under ``key``, or an
+    NDJSON body with one object per line.
+    """
+    if request.mimetype == "application/x-ndjson":
+        lines = request.get_data(as_text=True).splitlines()
+        return [json.loads(line) for line in lines if line.strip()]
+    data = request.get_json()
+    if isinstance(data, dict):
+        data = data.get(key)
+    if not isinstance(data, list):
+        raise ValueError(f"Expected a list of {key}")
+    return data
+
+
+def check_text(row, field, max_length, required):
+    value = row.get(field)
+    if value is None or value == "":
+        if required:
+            return None, f"{field} is required"
+        return value, None
+    if not isinstance(value, str):
+        return None, f"{field} must be a string"
+    if len(value) > max_length:
+        return None, f"{field} is longer than {max_length} characters"
+    return value, None
+
+
+def validate_project_row(row):
+    """Map one posted project onto column values, or return an error."""
+    if not isinstance(row, dict):
+        return None, "Row must be an object"
+    name, error = check_text(row, "project-name", 80, required=True)
+    if error:
+        return None, error
+    description, error = check_text(row, "project-description", 200, required=False)
+    if error:
+        return None, error
+    return {"name": name, "description": description}, None
+
+
+def validate_task_row(row, project_ids):
+    """Map one posted task onto column values, or return an error."""
+    if not isinstance(row, dict):
+        return None, "Row must be an object"
+    name, error = check_text(row, "task-name", 80, required=True)
+    if error:
+        return None, error
+    description, error = check_text(row, "task-description", 200, required=False)
+    if error:
+        return None, error
+    project_id = row.get("project-id")
+    try:
+        project_id = int(project_id)
+    except (TypeError, ValueError):
+        return None, "project-id must be an integer"
+    if project_id not in project_ids:
+        return None, f"Project {project_id} does not exist"
+    return {"name": name, "description": description, "project_id": project_id}, None
+
+
+def insert_batch(table, rows, validate):
+    """Validate every row, then insert the valid ones in one transaction.
+
+    Each inserted row is also written to the change log as
+    ``<table>_added``. Returns the JSON response body: generated ids in
+    request order (None for rejected rows) plus the per-row errors.
+    """
+    values, errors, positions = [], [], []
+    for index, row in enumerate(rows):
+        row_values, error = validate(row)
+        if error:
+            errors.append({"index": index, "error": error})
+        else:
+            values.append(row_values)
+            positions.append(index)
+
+    ids = [None] * len(rows)
+    if values:
+        result = db.session.execute(
+            insert(table).returning(table.c.id, sort_by_parameter_order=True),
+            values,
+        )
+        changes = []
+        for index, row_values, (new_id,) in zip(positions, values, result):
+            ids[index] = new_id
+            payload = {"id": new_id, **row_values}
+            changes.append((row_values.get("project_id", new_id), payload))
+        record_changes(f"{table.name}_added", changes)
+        db.session.commit()
+        changes_committed()
+    return {"success": not errors, "ids": ids, "errors": errors}
+
+
+def bulk_insert_response(key, table, validate_factory):
+    try:
+        rows = read_batch(key)
+    except ValueError as error:
+        return jsonify({"success": False, "error": str(error)}), 400
+    max_batch_size = app.config["MAX_BATCH_SIZE"]
+    if len(rows) > max_batch_size:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "error": f"Batch of {len(rows)} exceeds limit of {max_batch_size}",
+                }
+            ),
+            413,
+        )
+    return jsonify(insert_batch(table, rows, validate_factory(rows)))
+
+
+@app.route("/add_projects", methods=["POST"])
+def add_projects():
+    return bulk_insert_response(
+        "projects", Project.__table__, lambda rows: validate_project_row
+    )
+
+
+@app.route("/add_tasks", methods=["POST"])
+def add_tasks():
+    def validate_factory(rows):
+        # Look up every referenced project once instead of per row
+        requested = set()
+        for row in rows:
+            try:
+                requested.add(int(row.get("project-id")))
+            except (AttributeError, TypeError, ValueError):
+                pass
+        project_ids = set(
+            db.session.scalars(
+                select(Project.__table__.c.id).where(
+                    Project.__table__.c.id.in_(requested),
+                    Project.__table__.c.deleted_at.is_(None),
+                )
+            )
+        )
+        return lambda row: validate_task_row(row, project_ids)
+
+    return bulk_insert_response("tasks", Task.__table__, validate_factory)
+
+
+def increment_total(table, key_column, key, seconds):
+    statement = sqlite_insert(table).values({key_column: key, "seconds": seconds})
+    db.session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[key_column],
+            set_={"seconds": table.c.seconds + statement.excluded.seconds},
+        )
+    )
+
+
+def log_time(timer, until, close=False):
+    """Append the interval from ``timer.logged_until`` to ``until``.
+
+    At most TIMER_MAX_UNCONFIRMED seconds are logged, so a gap in which the
+    client sent no heartbeats isn't counted as work. The timer row is
+    advanced to ``until`` (or removed when ``close`` is set) only if no other
+    worker has moved it in the meantime, so every second is logged once.
+    Returns whether this call won that race. The caller commits.
+    """
+    active = ActiveTimer.__table__
+    guard = (active.c.task_id == timer.task_id) & (
+        active.c.logged_until == timer.logged_until
+    )
+    if close:
+        result = db.session.execute(delete(active).where(guard))
+    else:
+        result = db.session.execute(
+            update(active).where(guard).values(logged_until=until)
+        )
+    if result.rowcount != 1:
+        return False
+
+    seconds = max(0, int((until - timer.logged_until).total_seconds()))
+    seconds = min(seconds, app.config["TIMER_MAX_UNCONFIRMED"])
+    if seconds:
+        db.session.execute(
+            insert(TimeEntry.__table__).values(
+                task_id=timer.task_id,
+                project_id=timer.project_id,
+                started_at=timer.logged_until,
+                ended_at=timer.logged_until + timedelta(seconds=seconds),
+                seconds=seconds,
+            )
+        )
+        increment_total(TaskTimeTotal.__table__, "task_id", timer.task_id, seconds)
+        increment_total(
+            ProjectTimeTotal.__table__, "project_id", timer.project_id, seconds
+        )
+    return True
+
+
+def flush_heartbeats(heartbeats):
+    """Log the time reported by a batch of heartbeats in one transaction."""
+    with app.app_context():
+        active = ActiveTimer.__table__
+        timers = db.session.execute(
+            select(active).where(active.c.task_id.in_(list(heartbeats)))
+        ).all()
+        for timer in timers:
+            until = heartbeats[timer.task_id]
+            if until > timer.logged_until:
+                log_time(timer, until)
+        db.session.commit()
+
+
+heartbeat_buffer = HeartbeatBuffer(
+    flush_heartbeats, interval=app.config["HEARTBEAT_FLUSH_INTERVAL"]
+)
+atexit.register(heartbeat_buffer.stop)
+
+
+def task_seconds(task_id):
+    seconds = db.session.scalar(
+        select(TaskTimeTotal.__table__.c.seconds).where(
+            TaskTimeTotal.__table__.c.task_id == task_id
+        )
+    )
+    return seconds or 0
+
+
+def active_timer(task_id):
+    active = ActiveTimer.__table__
+    return db.session.execute(select(active).where(active.c.task_id == task_id)).first()
+
+
+def close_timer(task_id):
+    """Log a running timer up to now and remove it."""
+    heartbeat_buffer.pop(task_id)
+    now = utcnow()
+    while True:
+        timer = active_timer(task_id)
+        if timer is None:
+            return jsonify({"success": False, "error": "Timer is not running"}), 409
+        # A heartbeat flush may have moved the timer since it was read
+        if log_time(timer, now, close=True):
+            break
+    db.session.commit()
+    return jsonify({"success": True, "seconds": task_seconds(task_id)})
+
+
+@app.route("/start_timer/<int:task_id>", methods=["POST"])
+def start_timer(task_id):
+    # Tasks of soft-deleted projects are waiting for the reaper
+    project = Project.__table__
+    task = db.session.execute(
+        select(Task.__table__)
+        .join(project, project.c.id == Task.__table__.c.project_id)
+        .where(Task.__table__.c.id == task_id, project.c.deleted_at.is_(None))
+    ).first()
+    if task is None:
+        abort(404)
+    active = ActiveTimer.__table__
+    now = utcnow()
+    max_unconfirmed = timedelta(seconds=app.config["TIMER_MAX_UNCONFIRMED"])
+    while True:
+        timer = active_timer(task_id)
+        if timer is None or now - timer.logged_until <= max_unconfirmed:
+            break
+        # Left running by a closed tab: close it and start a fresh interval,
+        # unless a heartbeat flush moved it since it was read
+        heartbeat_buffer.pop(task_id)
+        if log_time(timer, now, close=True):
+            break
+    statement = sqlite_insert(active).values(
+        task_id=task.id, project_id=task.project_id, logged_until=now
+    )
+    db.session.execute(statement.on_conflict_do_nothing(index_elements=["task_id"]))
+    db.session.commit()
+    return jsonify({"success": True, "seconds": task_seconds(task_id)})
+
+
+@app.route("/timer_heartbeat/<int:task_id>", methods=["POST"])
+def timer_heartbeat(task_id):
+    # Buffered in memory; written by the heartbeat flusher thread
+    heartbeat_buffer.add(task_id, utcnow())
+    return jsonify({"success": True})
+
+
+@app.route("/pause_timer/<int:task_id>", methods=["POST"])
+def pause_timer(task_id):
+    return close_timer(task_id)
+
+
+@app.route("/stop_timer/<int:task_id>", methods=["POST"])
+def stop_timer(task_id):
+    return close_timer(task_id)
+
+
+@app.route("/task_time/<int:task_id>")
+def task_time(task_id):
+    return jsonify({"task_id": task_id, "seconds": task_seconds(task_id)})
+
+
+@app.route("/project_time/<int:project_id>")
+def project_time(project_id):
+    seconds = db.session.scalar(
+        select(ProjectTimeTotal.__table__.c.seconds).where(
+            ProjectTimeTotal.__table__.c.project_id == project_id
+        )
+    )
+    return jsonify({"project_id": project_id, "seconds": seconds or 0})
+
+
+def delete_project_rows(project_id, limit=None):
+    """Delete a project's rows, children first, with set-based statements.
+
+    With ``limit`` at most that many time entries or tasks are removed, and
+    the project row itself only goes once nothing references it. Returns
+    ``(rows_deleted, project_deleted)``. The caller commits.
+    """
+    task = Task.__table__
+    time_entry = TimeEntry.__table__
+    deleted = 0
+    for table in (time_entry, task):
+        ids = select(table.c.id).where(table.c.project_id == project_id)
+        if limit is not None:
+            ids = ids.limit(limit - deleted)
+        deleted += db.session.execute(delete(table).where(table.c.id.in_(ids))).rowcount
+        if limit is not None and deleted >= limit:
+            return deleted, False
+    for table in (ActiveTimer.__table__, ProjectTimeTotal.__table__):
+        db.session.execute(delete(table).where(table.c.project_id == project_id))
+    project = Project.__table__
+    db.session.execute(delete(project).where(project.c.id == project_id))
+    return deleted, True
+
+
+def reap_chunk():
+    """Remove one bounded chunk of a soft-deleted project's rows."""
+    with app.app_context():
+        project = Project.__table__
+        project_id = db.session.scalar(
+            select(project.c.id)
+            .where(project.c.deleted_at.is_not(None))
+            .order_by(project.c.deleted_at)
+            .limit(1)
+        )
+        if project_id is None:
+            return 0, 0
+        rows, finished = delete_project_rows(
+            project_id, limit=app.config["REAPER_CHUNK_SIZE"]
+        )
+        db.session.commit()
+        return rows, int(finished)
+
+
+reaper = Reaper(
+    reap_chunk, interval=app.config["REAPER_INTERVAL"], pause=app.config["REAPER_PAUSE"]
+)
+
+
+@app.before_request
+def start_reaper():
+    # Pick up projects soft-deleted before this worker started
+    reaper.start()
+
+
+def pending_deletions():
+    project = Project.__table__
+    return db.session.scalar(
+        select(func.count(project.c.id)).where(project.c.deleted_at.is_not(None))
+    )
+
+
+def reaper_metrics():
+    status = reaper.status()
+    yield "# HELP reaper_rows_deleted_total Rows removed by the project reaper."
+    yield "# TYPE reaper_rows_deleted_total counter"
+    yield f"reaper_rows_deleted_total {status['rows_deleted']}"
+    yield "# HELP reaper_projects_reaped_total Soft-deleted projects fully removed."
+    yield "# TYPE reaper_projects_reaped_total counter"
+    yield f"reaper_projects_reaped_total {status['projects_reaped']}"
+    yield "# HELP reaper_rows_per_second Reaper throughput while deleting."
+    yield "# TYPE reaper_rows_per_second gauge"
+    yield f"reaper_rows_per_second {status['rows_per_second']}"
+
+
+instrumentation.add_collector(reaper_metrics)
+
+
+@app.route("/reaper_status")
+def reaper_status():
+    status = reaper.status()
+    status["pending_projects"] = pending_deletions()
+    return jsonify(status)
+
+
 @app.route("/delete_project/<int:project_id>", methods=["DELETE"])
 def delete_project(project_id):
-    project = Project.query.get_or_404(project_id)
-    db.session.delete(project)
+    project = Project.__table__
+    live = (project.c.id == project_id) & project.c.deleted_at.is_(None)
+    if app.config["PROJECT_DELETE_MODE"] == "soft":
+        result = db.session.execute(
+            update(project).where(live).values(deleted_at=utcnow())
+        )
+        if result.rowcount != 1:
+            abort(404)
+    else:
+        if db.session.scalar(select(project.c.id).where(live)) is None:
+            abort(404)
+        delete_project_rows(project_id)
+    record_changes("project_deleted", [(project_id, {"id": project_id})])
     db.session.commit()
+    changes_committed()
+    if app.config["PROJECT_DELETE_MODE"] == "soft":
+        reaper.wake()
     return jsonify({"message": f"Project {project_id} deleted successfully"}), 200
 
 
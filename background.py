@@ -0,0 +1,29 @@
+import threading
+
+
+class BackgroundThread:
+    """A daemon thread running ``target``, started on first use.
+
+    :meth:`start` is cheap enough to call on every request; only the first
+    call, from whichever thread gets there, starts the thread.
+    """
+
+    def __init__(self, target, name):
+        self.target = target
+        self.name = name
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self.target, name=self.name, daemon=True
+            )
+            self._thread.start()
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
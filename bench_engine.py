@@ -0,0 +1,130 @@
+"""Compare SQLite read/write throughput with and without the engine profile.
+
+Runs concurrent reader and writer threads against a scratch database, first
+with default engine settings and then with the pragmas, pool sizes and
+read/write split configured in app.py.
+
+    python bench_engine.py --readers 8 --writers 2 --seconds 10
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.exc import OperationalError
+
+from app import Project, Task, app, db
+from engine_profile import make_reader_engine, set_sqlite_pragmas
+
+
+def default_engines(path):
+    engine = create_engine(f"sqlite:///{path}")
+    return engine, engine
+
+
+def profiled_engines(path):
+    writer = create_engine(f"sqlite:///{path}", **app.config["WRITER_ENGINE_OPTIONS"])
+    set_sqlite_pragmas(writer, app.config["SQLITE_PRAGMAS"])
+    reader = make_reader_engine(
+        writer, app.config["READER_ENGINE_OPTIONS"], app.config["SQLITE_PRAGMAS"]
+    )
+    return writer, reader
+
+
+def seed(engine, projects, tasks_per_project):
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(Project.__table__),
+            [{"name": f"Project {i}", "description": ""} for i in range(projects)],
+        )
+        connection.execute(
+            insert(Task.__table__),
+            [
+                {"name": f"Task {i}", "description": "", "project_id": i % projects + 1}
+                for i in range(projects * tasks_per_project)
+            ],
+        )
+
+
+def run(writer, reader, args):
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.seconds
+    task = Task.__table__
+
+    def record(key):
+        with lock:
+            counts[key] += 1
+
+    def read_loop(worker):
+        project_id = worker % args.projects + 1
+        while time.monotonic() < deadline:
+            try:
+                with reader.connect() as connection:
+                    connection.execute(
+                        select(task.c.id, task.c.name)
+                        .where(task.c.project_id == project_id)
+                        .order_by(task.c.id)
+                        .limit(100)
+                    ).all()
+                    connection.execute(select(func.count(task.c.id))).scalar()
+                record("reads")
+            except OperationalError:
+                record("errors")
+
+    def write_loop(worker):
+        project_id = worker % args.projects + 1
+        while time.monotonic() < deadline:
+            try:
+                with writer.begin() as connection:
+                    connection.execute(
+                        insert(task),
+                        {"name": "bench", "description": "", "project_id": project_id},
+                    )
+                record("writes")
+            except OperationalError:
+                record("errors")
+
+    threads = [
+        threading.Thread(target=read_loop, args=(i,)) for i in range(args.readers)
+    ] + [threading.Thread(target=write_loop, args=(i,)) for i in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--projects", type=int, default=50)
+    parser.add_argument("--tasks-per-project", type=int, default=200)
+    args = parser.parse_args()
+
+    for label, make_engines in (
+        ("default", default_engines),
+        ("profile", profiled_engines),
+    ):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bench.db")
+            writer, reader = make_engines(path)
+            seed(writer, args.projects, args.tasks_per_project)
+            counts = run(writer, reader, args)
+            reader.dispose()
+            writer.dispose()
+        print(
+            f"{label:8} reads/s={counts['reads'] / args.seconds:10.1f} "
+            f"writes/s={counts['writes'] / args.seconds:10.1f} "
+            f"errors={counts['errors']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Compare /search's FTS5 query with LIKE scans on a large generated dataset.
+
+    python bench_search.py --tasks 2000000 --projects 20000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine, or_, select
+
+from app import Project, Task
+from search import search
+from seed_db import seed
+
+
+def like_search(connection, term, limit):
+    project = Project.__table__
+    task = Task.__table__
+    pattern = f"%{term}%"
+    rows = connection.execute(
+        select(project.c.id)
+        .where(or_(project.c.name.like(pattern), project.c.description.like(pattern)))
+        .limit(limit)
+    ).all()
+    rows += connection.execute(
+        select(task.c.id)
+        .where(or_(task.c.name.like(pattern), task.c.description.like(pattern)))
+        .limit(limit)
+    ).all()
+    return rows[:limit]
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--projects", type=int, default=20000)
+    parser.add_argument("--tasks", type=int, default=2000000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("terms", nargs="*", default=["api", "invoice", "websocket"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        start = time.perf_counter()
+        seed(engine, args.projects, args.tasks)
+        print(
+            f"seeded {args.projects} projects and {args.tasks} tasks "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+        # LIKE returns the first matches it finds, unranked, so it only has to
+        # scan the whole table for rare terms; FTS5 ranks every match
+        with engine.connect() as connection:
+            for term in args.terms:
+                fts_ms = timed(
+                    lambda: search(connection, term, args.limit, 0), args.repeat
+                )
+                like_ms = timed(
+                    lambda: like_search(connection, term, args.limit), args.repeat
+                )
+                print(f"{term:12} fts={fts_ms:9.2f}ms like={like_ms:9.2f}ms")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
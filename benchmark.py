@@ -0,0 +1,291 @@
+"""Measure per-route latency and throughput, and catch regressions.
+
+Runs each route scenario either through the Flask test client or over HTTP
+with several threads against a local server, then reports p50/p95/p99
+latency and requests per second. Results can be saved as JSON and compared
+with a stored baseline; the run fails if a route's p95 got slower than the
+baseline by more than the tolerance.
+
+    DATABASE_URL=sqlite:////tmp/bench.db python seed_db.py --tasks 1000000
+    DATABASE_URL=sqlite:////tmp/bench.db python benchmark.py --client http \\
+        --threads 8 --output run.json --baseline baseline.json
+
+Project ids to request, and the throwaway projects that delete_project
+removes, come from the local DATABASE_URL. ``--client http --url`` therefore
+assumes the server at that URL uses the same database. dashboard_uncached
+clears the dashboard cache before each request, which only reaches servers
+running in this process, so it is skipped with ``--url``.
+
+A baseline only makes sense for the same setup, so the check also fails
+when client, threads, requests or url differ from the baseline's.
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import random
+import sys
+import threading
+import time
+import urllib.request
+from datetime import datetime, timezone
+
+from sqlalchemy import func, select
+from werkzeug.serving import make_server
+
+from app import Project, Task, app, db, fragment_cache
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+class TestClientDriver:
+    """Sends requests through the Flask test client, one client per thread."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def request(self, method, path, body=None):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = app.test_client()
+        response = client.open(path, method=method, json=body)
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class HTTPDriver:
+    """Sends real HTTP requests, starting a local threaded server if no URL is given."""
+
+    def __init__(self, url=None):
+        self.server = None
+        if url is None:
+            # Per-request access logs would drown out the results
+            logging.getLogger("werkzeug").setLevel(logging.ERROR)
+            self.server = make_server("127.0.0.1", 0, app, threaded=True)
+            threading.Thread(target=self.server.serve_forever, daemon=True).start()
+            url = f"http://127.0.0.1:{self.server.server_port}"
+        self.url = url.rstrip("/")
+
+    def request(self, method, path, body=None):
+        data = None
+        headers = {}
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        request = urllib.request.Request(
+            self.url + path, data=data, headers=headers, method=method
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as error:
+            return error.code
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+
+
+def scenarios(rng):
+    """Build request factories for each route, drawing ids from the database."""
+    with app.app_context():
+        project_ids = db.session.scalars(select(Project.id)).all()
+        # The biggest projects are the interesting ones for task listing
+        largest = db.session.scalars(
+            select(Task.project_id)
+            .group_by(Task.project_id)
+            .order_by(func.count(Task.id).desc())
+            .limit(10)
+        ).all()
+    if not project_ids:
+        sys.exit("The database is empty; load data with seed_db.py first.")
+    lock = threading.Lock()
+
+    def project_tasks():
+        with lock:
+            project_id = rng.choice(largest or project_ids)
+        return "GET", f"/project_tasks/{project_id}", None
+
+    def add_task():
+        with lock:
+            project_id = rng.choice(project_ids)
+        body = {
+            "task-name": "Benchmark task",
+            "task-description": "",
+            "project-id": project_id,
+        }
+        return "POST", "/add_task", body
+
+    def dashboard_uncached():
+        # Measure project_summaries() and the render instead of a cache hit
+        fragment_cache.clear()
+        return "GET", "/dashboard", None
+
+    return {
+        "dashboard": lambda: ("GET", "/dashboard", None),
+        "dashboard_uncached": dashboard_uncached,
+        "project_tasks": project_tasks,
+        "add_task": add_task,
+    }
+
+
+def delete_project_requests(count):
+    """delete_project needs fresh projects to remove, so create them up front."""
+    ids = []
+    for _ in range(count):
+        with app.app_context():
+            project = Project(name="Benchmark project", description="")
+            db.session.add(project)
+            db.session.commit()
+            ids.append(project.id)
+    ids = iter(ids)
+    lock = threading.Lock()
+
+    def delete_project():
+        with lock:
+            project_id = next(ids)
+        return "DELETE", f"/delete_project/{project_id}", None
+
+    return delete_project
+
+
+def run_route(driver, make_request, requests, threads):
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    counter = itertools.count()
+
+    def worker():
+        nonlocal errors
+        while next(counter) < requests:
+            method, path, body = make_request()
+            start = time.perf_counter()
+            status = driver.request(method, path, body)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if status >= 400:
+                    errors += 1
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "throughput_rps": len(latencies) / wall,
+    }
+
+
+# Settings that must match for a baseline comparison to mean anything
+COMPARABLE_META = ("client", "threads", "requests", "url")
+
+
+def regressions(results, baseline, tolerance):
+    """Return a message for every route whose p95 exceeds the baseline, and
+    for every setting that differs from the baseline's."""
+    messages = []
+    for key in COMPARABLE_META:
+        current = results["meta"].get(key)
+        previous = baseline.get("meta", {}).get(key)
+        if current != previous:
+            messages.append(
+                f"{key} is {current!r} but the baseline used {previous!r}; "
+                "results are not comparable"
+            )
+    for route, stats in results["routes"].items():
+        previous = baseline.get("routes", {}).get(route)
+        if previous is None:
+            continue
+        limit = previous["p95_ms"] * (1 + tolerance)
+        if stats["p95_ms"] > limit:
+            messages.append(
+                f"{route}: p95 {stats['p95_ms']:.2f}ms exceeds baseline "
+                f"{previous['p95_ms']:.2f}ms by more than {tolerance:.0%}"
+            )
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--client", choices=("test", "http"), default="test")
+    parser.add_argument("--url", help="Benchmark a running server instead")
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=200, help="Per route")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--routes", nargs="*", help="Only run these routes")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Fail if slower than this results file")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    driver = TestClientDriver() if args.client == "test" else HTTPDriver(args.url)
+    routes = scenarios(rng)
+    if args.url:
+        # The dashboard cache to clear lives in the other server's process
+        del routes["dashboard_uncached"]
+    routes["delete_project"] = None
+    if args.routes:
+        routes = {name: routes[name] for name in args.routes}
+    if "delete_project" in routes:
+        # Only insert the throwaway projects when the route actually runs
+        routes["delete_project"] = delete_project_requests(args.requests)
+
+    results = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "client": args.client,
+            "threads": args.threads,
+            "requests": args.requests,
+            "seed": args.seed,
+            "url": args.url,
+            "database": app.config["SQLALCHEMY_DATABASE_URI"],
+        },
+        "routes": {},
+    }
+    try:
+        for name, make_request in routes.items():
+            stats = run_route(driver, make_request, args.requests, args.threads)
+            results["routes"][name] = stats
+            print(
+                f"{name:18} p50={stats['p50_ms']:8.2f}ms p95={stats['p95_ms']:8.2f}ms "
+                f"p99={stats['p99_ms']:8.2f}ms {stats['throughput_rps']:8.1f} req/s "
+                f"errors={stats['errors']}"
+            )
+    finally:
+        driver.close()
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            failures = regressions(results, json.load(file), args.tolerance)
+        for message in failures:
+            print(f"FAIL {message}")
+        if failures:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+from flask import current_app, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+
+# Requests with these methods never write, so they can use the reader engine
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+DEFAULT_SQLITE_PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "busy_timeout": 5000,
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+    "foreign_keys": "on",
+}
+
+
+def set_sqlite_pragmas(engine, pragmas):
+    """Run ``PRAGMA name=value`` for every pragma on each new connection."""
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def is_memory_sqlite(url):
+    """Whether ``url`` is an in-memory SQLite database.
+
+    Flask-SQLAlchemy serves those from one shared connection (``StaticPool``),
+    which takes no pool sizing options.
+    """
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def make_reader_engine(writer, options, pragmas):
+    """Create a read-only engine on the writer's database.
+
+    File-backed SQLite is opened again with ``mode=ro``; any other database
+    (including in-memory SQLite, which can't be shared) reuses the writer.
+    """
+    url = writer.url
+    if url.get_backend_name() != "sqlite" or is_memory_sqlite(url):
+        return writer
+    database = url.database
+    if url.query.get("uri"):
+        database = database[len("file:") :].split("?")[0]
+    reader = create_engine(f"sqlite:///file:{database}?mode=ro&uri=true", **options)
+    # journal_mode is stored in the database file and can only be set by a writer
+    set_sqlite_pragmas(
+        reader, {key: value for key, value in pragmas.items() if key != "journal_mode"}
+    )
+    return reader
+
+
+def init_engine_profile(app, db):
+    """Initialize ``db`` with the writer pool options, apply pragmas to the
+    writer engine and register the reader engine."""
+    if not is_memory_sqlite(app.config["SQLALCHEMY_DATABASE_URI"]):
+        options = app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {})
+        for key, value in app.config["WRITER_ENGINE_OPTIONS"].items():
+            options.setdefault(key, value)
+    db.init_app(app)
+    pragmas = app.config["SQLITE_PRAGMAS"]
+    with app.app_context():
+        writer = db.engine
+    set_sqlite_pragmas(writer, pragmas)
+    app.extensions["reader_engine"] = make_reader_engine(
+        writer, app.config["READER_ENGINE_OPTIONS"], pragmas
+    )
+
+
+def reader_engine():
+    return current_app.extensions["reader_engine"]
+
+
+class RoutingSession(Session):
+    """Session that sends queries from read-only requests to the reader engine."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and has_request_context()
+            and request.method in READ_METHODS
+        ):
+            return reader_engine()
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -0,0 +1,119 @@
+"""Fan-out of change-log entries to Server-Sent Events subscribers.
+
+One broadcaster thread per process polls the change log for rows past the
+last sequence number it has seen and hands each new change to every
+subscriber's queue, so the database sees one poll per process no matter
+how many clients are connected. Writers in the same process call
+:meth:`ChangeBroadcaster.notify` to skip the wait.
+"""
+
+import json
+import logging
+import queue
+import threading
+
+from background import BackgroundThread
+
+log = logging.getLogger(__name__)
+
+
+class ChangeBroadcaster:
+    def __init__(self, fetch_since, interval=1.0):
+        """``fetch_since(seq, limit)`` returns up to ``limit`` changes after
+        ``seq`` as ``(seq, kind, payload)`` tuples in sequence order."""
+        self.fetch_since = fetch_since
+        self.interval = interval
+        self.last_seq = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = BackgroundThread(self._run, "change-broadcaster")
+        self._wake = threading.Event()
+
+    def start(self):
+        self._thread.start()
+
+    def notify(self):
+        self._wake.set()
+
+    def subscribe(self):
+        """Register a subscriber queue.
+
+        Every change after ``last_seq`` will be delivered to it, so the
+        caller's backfill only has to cover changes up to that point.
+        """
+        subscriber = queue.Queue()
+        with self._lock:
+            if self.last_seq is None:
+                # Read the tip now, not in the thread's first poll, so a
+                # change committed after the caller's backfill isn't skipped
+                self.last_seq = self.fetch_since(None, 0)
+            self._subscribers.add(subscriber)
+        self.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def poll(self, limit=1000):
+        """Fetch changes past ``last_seq`` and push them to every subscriber."""
+        if self.last_seq is None:
+            return 0
+        changes = self.fetch_since(self.last_seq, limit)
+        if not changes:
+            return 0
+        self.last_seq = changes[-1][0]
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            for change in changes:
+                subscriber.put(change)
+        return len(changes)
+
+    def _run(self):
+        while True:
+            try:
+                if self.poll():
+                    continue
+            except Exception:
+                # e.g. "database is locked"; the poll is retried next round
+                log.exception("Failed to poll the change log")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+
+def format_event(seq, kind, payload):
+    return f"id: {seq}\nevent: {kind}\ndata: {json.dumps(payload)}\n\n"
+
+
+def event_stream(broadcaster, since, backfill_limit, keepalive=15):
+    """Yield SSE messages for every change after ``since``, then live ones.
+
+    The subscription starts before the backfill query so nothing committed in
+    between is lost; duplicates are dropped by sequence number. If more than
+    ``backfill_limit`` changes were missed, or the ones right after ``since``
+    have been pruned (sequence numbers have no gaps), the client is told to
+    reload.
+    """
+    subscriber = broadcaster.subscribe()
+    try:
+        last_seq = since
+        backlog = broadcaster.fetch_since(since, backfill_limit + 1)
+        pruned = backlog and backlog[0][0] != since + 1
+        if len(backlog) > backfill_limit or pruned:
+            yield f"event: reset\ndata: {json.dumps({'seq': since})}\n\n"
+            return
+        for seq, kind, payload in backlog:
+            last_seq = seq
+            yield format_event(seq, kind, payload)
+        while True:
+            try:
+                seq, kind, payload = subscriber.get(timeout=keepalive)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            if seq > last_seq:
+                last_seq = seq
+                yield format_event(seq, kind, payload)
+    finally:
+        broadcaster.unsubscribe(subscriber)
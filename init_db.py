@@ -1,5 +1,26 @@
+import sys
+
+from sqlalchemy import inspect
+
 from app import db, app
+from search import rebuild_search_index
 
 with app.app_context():
     db.create_all()
+    # Databases created before soft deletes lack the project.deleted_at column
+    columns = {column["name"] for column in inspect(db.engine).get_columns("project")}
+    if "deleted_at" not in columns:
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql(
+                "ALTER TABLE project ADD COLUMN deleted_at DATETIME"
+            )
+    # create_all skips indexes on tables that already exist
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
     print("Database and tables created successfully.")
+
+    if "--rebuild-search" in sys.argv:
+        with db.engine.begin() as connection:
+            rebuild_search_index(connection)
+        print("Search index rebuilt successfully.")
@@ -0,0 +1,181 @@
+"""Request and SQL instrumentation exported in Prometheus text format.
+
+A sampled fraction of requests records its latency, query count and time
+spent in SQL. Queries slower than the threshold are logged. Other consumers
+can subscribe with :meth:`Instrumentation.add_observer`.
+"""
+
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+slow_query_log = logging.getLogger("slow_queries")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+
+class Histogram:
+    """Cumulative histogram with fixed upper bounds, as Prometheus expects."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f"{name}_sum{{{labels}}} {self.sum}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Instrumentation:
+    def __init__(self, app=None, engines=()):
+        self._lock = threading.Lock()
+        self._observers = []
+        self._collectors = []
+        self.latency = {}
+        self.query_counts = {}
+        self.query_seconds = {}
+        self.responses = {}
+        self.slow_queries = 0
+        if app is not None:
+            self.init_app(app, engines)
+
+    def init_app(self, app, engines):
+        app.config.setdefault("METRICS_ENABLED", True)
+        app.config.setdefault("METRICS_SAMPLE_RATE", 1.0)
+        app.config.setdefault("METRICS_TIMING_HEADERS", False)
+        app.config.setdefault("SLOW_QUERY_THRESHOLD", 0.1)
+        self.app = app
+        if not app.config["METRICS_ENABLED"]:
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        for engine in set(engines):
+            event.listen(engine, "before_cursor_execute", self._before_query)
+            event.listen(engine, "after_cursor_execute", self._after_query)
+
+    def add_observer(self, callback):
+        """Call ``callback(endpoint, method, status, seconds, queries, query_seconds)``
+        after every sampled request."""
+        self._observers.append(callback)
+
+    def add_collector(self, callback):
+        """Append the Prometheus lines yielded by ``callback()`` to :meth:`render`."""
+        self._collectors.append(callback)
+
+    def _before_request(self):
+        if random.random() < self.app.config["METRICS_SAMPLE_RATE"]:
+            g.metrics = {"start": time.perf_counter(), "queries": 0, "query_seconds": 0}
+
+    def _after_request(self, response):
+        sample = g.pop("metrics", None)
+        if sample is None:
+            return response
+        seconds = time.perf_counter() - sample["start"]
+        key = (request.endpoint or "unknown", request.method)
+        with self._lock:
+            if key not in self.latency:
+                self.latency[key] = Histogram(LATENCY_BUCKETS)
+                self.query_counts[key] = Histogram(QUERY_COUNT_BUCKETS)
+                self.query_seconds[key] = 0
+            self.latency[key].observe(seconds)
+            self.query_counts[key].observe(sample["queries"])
+            self.query_seconds[key] += sample["query_seconds"]
+            status_key = key + (response.status_code,)
+            self.responses[status_key] = self.responses.get(status_key, 0) + 1
+        for observer in self._observers:
+            observer(
+                key[0],
+                key[1],
+                response.status_code,
+                seconds,
+                sample["queries"],
+                sample["query_seconds"],
+            )
+
+        if self.app.config["METRICS_TIMING_HEADERS"]:
+            response.headers["X-Query-Count"] = str(sample["queries"])
+            response.headers["Server-Timing"] = (
+                f'db;dur={sample["query_seconds"] * 1000:.2f};'
+                f'desc="{sample["queries"]} queries", '
+                f"app;dur={seconds * 1000:.2f}"
+            )
+        return response
+
+    def _before_query(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and "metrics" in g:
+            context._query_start = time.perf_counter()
+
+    def _after_query(self, conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_query_start", None)
+        if start is None or not has_request_context() or "metrics" not in g:
+            return
+        seconds = time.perf_counter() - start
+        g.metrics["queries"] += 1
+        g.metrics["query_seconds"] += seconds
+        if seconds >= self.app.config["SLOW_QUERY_THRESHOLD"]:
+            with self._lock:
+                self.slow_queries += 1
+            slow_query_log.warning(
+                "%.1fms in %s: %s", seconds * 1000, request.endpoint, statement
+            )
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            lines.append(
+                "# HELP http_request_duration_seconds Request latency by endpoint."
+            )
+            lines.append("# TYPE http_request_duration_seconds histogram")
+            for (endpoint, method), histogram in sorted(self.latency.items()):
+                labels = f'endpoint="{escape_label(endpoint)}",method="{method}"'
+                lines.extend(histogram.lines("http_request_duration_seconds", labels))
+
+            lines.append("# HELP http_responses_total Responses by endpoint and status.")
+            lines.append("# TYPE http_responses_total counter")
+            for (endpoint, method, status), count in sorted(self.responses.items()):
+                labels = (
+                    f'endpoint="{escape_label(endpoint)}",method="{method}",'
+                    f'status="{status}"'
+                )
+                lines.append(f"http_responses_total{{{labels}}} {count}")
+
+            lines.append("# HELP db_queries_per_request SQL queries issued per request.")
+            lines.append("# TYPE db_queries_per_request histogram")
+            for (endpoint, method), histogram in sorted(self.query_counts.items()):
+                labels = f'endpoint="{escape_label(endpoint)}",method="{method}"'
+                lines.extend(histogram.lines("db_queries_per_request", labels))
+
+            lines.append("# HELP db_query_seconds_total Time spent in SQL by endpoint.")
+            lines.append("# TYPE db_query_seconds_total counter")
+            for (endpoint, method), seconds in sorted(self.query_seconds.items()):
+                labels = f'endpoint="{escape_label(endpoint)}",method="{method}"'
+                lines.append(f"db_query_seconds_total{{{labels}}} {seconds}")
+
+            lines.append("# HELP db_slow_queries_total Queries over the slow threshold.")
+            lines.append("# TYPE db_slow_queries_total counter")
+            lines.append(f"db_slow_queries_total {self.slow_queries}")
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,78 @@
+import threading
+import time
+
+from background import BackgroundThread
+
+
+class Reaper:
+    """Background thread that removes soft-deleted rows in bounded chunks.
+
+    ``reap_chunk`` deletes at most one chunk in its own transaction and
+    returns ``(rows_deleted, projects_finished)``. The thread pauses between
+    chunks so other writers get the database lock, and sleeps for
+    ``interval`` seconds once there is nothing left to delete.
+    """
+
+    def __init__(self, reap_chunk, interval=5, pause=0.05):
+        self.reap_chunk = reap_chunk
+        self.interval = interval
+        self.pause = pause
+        self.rows_deleted = 0
+        self.projects_reaped = 0
+        self.chunks = 0
+        self.busy_seconds = 0.0
+        self.last_chunk_at = None
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._thread = BackgroundThread(self._run, "reaper")
+        self._wake = threading.Event()
+
+    def start(self):
+        self._thread.start()
+
+    def wake(self):
+        """Start reaping now instead of at the end of the current sleep."""
+        self.start()
+        self._wake.set()
+
+    def run_once(self):
+        """Delete one chunk and record it; return the number of rows deleted."""
+        start = time.perf_counter()
+        rows, projects = self.reap_chunk()
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            if rows or projects:
+                self.chunks += 1
+                self.rows_deleted += rows
+                self.projects_reaped += projects
+                self.busy_seconds += elapsed
+                self.last_chunk_at = time.time()
+        return rows + projects
+
+    def status(self):
+        with self._lock:
+            return {
+                "running": self._thread.is_alive(),
+                "rows_deleted": self.rows_deleted,
+                "projects_reaped": self.projects_reaped,
+                "chunks": self.chunks,
+                "rows_per_second": (
+                    self.rows_deleted / self.busy_seconds if self.busy_seconds else 0
+                ),
+                "last_chunk_at": self.last_chunk_at,
+                "last_error": self.last_error,
+            }
+
+    def _run(self):
+        while True:
+            try:
+                deleted = self.run_once()
+            except Exception as error:
+                with self._lock:
+                    self.last_error = repr(error)
+                deleted = 0
+            if deleted:
+                time.sleep(self.pause)
+            else:
+                self._wake.wait(self.interval)
+                self._wake.clear()
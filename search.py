@@ -0,0 +1,125 @@
+"""Full-text search over projects and tasks using SQLite FTS5.
+
+Each source table gets an external-content FTS5 index kept in sync by
+triggers, so rows written through the ORM or through Core bulk inserts are
+indexed alike.
+"""
+
+import re
+
+from markupsafe import escape
+from sqlalchemy import text
+
+SEARCHABLE_TABLES = ("project", "task")
+
+# Snippet markers that can't appear in user text; swapped for <mark> after escaping
+MATCH_START = "\x02"
+MATCH_END = "\x03"
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def search_index_ddl(table):
+    fts = f"{table}_fts"
+    insert_row = (
+        f"INSERT INTO {fts}(rowid, name, description) "
+        "VALUES (new.id, new.name, new.description);"
+    )
+    delete_row = (
+        f"INSERT INTO {fts}({fts}, rowid, name, description) "
+        "VALUES ('delete', old.id, old.name, old.description);"
+    )
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"name, description, content='{table}', content_rowid='id')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} "
+        f"BEGIN {insert_row} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} "
+        f"BEGIN {delete_row} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} "
+        f"BEGIN {delete_row} {insert_row} END",
+    ]
+
+
+def rebuild_table_index(connection, table):
+    fts = f"{table}_fts"
+    connection.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def create_search_index(connection):
+    """Create the FTS5 tables and sync triggers if they don't exist yet.
+
+    A new index is filled from its table right away. The update and delete
+    triggers tell FTS5 to drop the old row, which corrupts the index if that
+    row was never indexed.
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    for table in SEARCHABLE_TABLES:
+        exists = connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (f"{table}_fts",),
+        ).first()
+        for statement in search_index_ddl(table):
+            connection.exec_driver_sql(statement)
+        if exists is None:
+            rebuild_table_index(connection, table)
+
+
+def rebuild_search_index(connection):
+    """Re-index every existing project and task, e.g. to repair the index."""
+    create_search_index(connection)
+    for table in SEARCHABLE_TABLES:
+        rebuild_table_index(connection, table)
+
+
+def match_expression(query):
+    """Turn free text into an FTS5 query matching every word as a prefix."""
+    tokens = TOKEN_PATTERN.findall(query)
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+SEARCH_SQL = text(
+    f"""
+    SELECT 'project' AS kind, project.id AS id, project.id AS project_id,
+           project.name AS name,
+           snippet(project_fts, -1, '{MATCH_START}', '{MATCH_END}', '…', 12) AS snippet,
+           project_fts.rank AS rank
+    FROM project_fts JOIN project ON project.id = project_fts.rowid
+    WHERE project_fts MATCH :match AND project.deleted_at IS NULL
+    UNION ALL
+    SELECT 'task', task.id, task.project_id, task.name,
+           snippet(task_fts, -1, '{MATCH_START}', '{MATCH_END}', '…', 12),
+           task_fts.rank
+    FROM task_fts JOIN task ON task.id = task_fts.rowid
+    JOIN project ON project.id = task.project_id
+    WHERE task_fts MATCH :match AND project.deleted_at IS NULL
+    ORDER BY rank
+    LIMIT :limit OFFSET :offset
+    """
+)
+
+
+def highlight(snippet):
+    html = str(escape(snippet or ""))
+    return html.replace(MATCH_START, "<mark>").replace(MATCH_END, "</mark>")
+
+
+def search(connection, query, limit, offset):
+    """Return ranked matches as dicts, best first."""
+    match = match_expression(query)
+    if not match:
+        return []
+    rows = connection.execute(
+        SEARCH_SQL, {"match": match, "limit": limit, "offset": offset}
+    )
+    return [
+        {
+            "kind": row.kind,
+            "id": row.id,
+            "project_id": row.project_id,
+            "name": row.name,
+            "snippet": highlight(row.snippet),
+        }
+        for row in rows
+    ]
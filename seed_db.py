@@ -0,0 +1,108 @@
+"""Bulk-load a reproducible synthetic dataset of projects and tasks.
+
+Task counts per project follow a Zipf-like skew, so a few projects are huge
+and most are small, as in real use. The same ``--seed`` always produces the
+same data. The target database is the app's, selected with DATABASE_URL:
+
+    DATABASE_URL=sqlite:////tmp/bench.db python seed_db.py --projects 10000 --tasks 1000000
+"""
+
+import argparse
+import itertools
+import math
+import random
+import time
+
+from sqlalchemy import insert
+
+from app import Project, Task, app, db
+from search import SEARCHABLE_TABLES, rebuild_search_index
+
+WORDS = (
+    "api backend billing bug cache checkout cleanup client copy dashboard "
+    "database deploy design docs email export feature fix frontend hero "
+    "import invoice landing login logo metrics migration mobile onboarding "
+    "payment performance profile refactor release report review search "
+    "security settings signup staging style test upload websocket"
+).split()
+
+
+# Exponentially skewed word choice so some terms are common and others rare
+WORD_WEIGHTS = list(itertools.accumulate(math.exp(-rank / 8) for rank in range(len(WORDS))))
+
+
+def sentence(rng, length):
+    return " ".join(rng.choices(WORDS, cum_weights=WORD_WEIGHTS, k=length))
+
+
+def project_weights(projects, skew):
+    """Cumulative Zipf weights: project n gets a share proportional to 1 / n**skew."""
+    return list(itertools.accumulate(1 / rank**skew for rank in range(1, projects + 1)))
+
+
+def seed(engine, projects, tasks, seed=0, skew=1.0, chunk_size=50000):
+    """Insert ``projects`` projects and ``tasks`` tasks in one transaction."""
+    rng = random.Random(seed)
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        if connection.dialect.name == "sqlite":
+            # Durability is pointless for throwaway data and slows the load down
+            connection.exec_driver_sql("PRAGMA synchronous=OFF")
+            # Index everything in one pass at the end instead of row by row
+            for table in SEARCHABLE_TABLES:
+                for trigger in ("ai", "ad", "au"):
+                    connection.exec_driver_sql(
+                        f"DROP TRIGGER IF EXISTS {table}_fts_{trigger}"
+                    )
+        result = connection.execute(
+            insert(Project.__table__).returning(
+                Project.__table__.c.id, sort_by_parameter_order=True
+            ),
+            [
+                {"name": sentence(rng, 3), "description": sentence(rng, 12)}
+                for _ in range(projects)
+            ],
+        )
+        project_ids = result.scalars().all()
+        # Shuffle so the biggest projects aren't simply the oldest ones
+        rng.shuffle(project_ids)
+        cum_weights = project_weights(projects, skew)
+        for start in range(0, tasks, chunk_size):
+            count = min(chunk_size, tasks - start)
+            owners = rng.choices(project_ids, cum_weights=cum_weights, k=count)
+            connection.execute(
+                insert(Task.__table__),
+                [
+                    {
+                        "name": sentence(rng, 4),
+                        "description": sentence(rng, 16),
+                        "project_id": owner,
+                    }
+                    for owner in owners
+                ],
+            )
+        if connection.dialect.name == "sqlite":
+            rebuild_search_index(connection)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--projects", type=int, default=1000)
+    parser.add_argument("--tasks", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--skew", type=float, default=1.0, help="Zipf exponent; 0 spreads tasks evenly"
+    )
+    args = parser.parse_args()
+
+    with app.app_context():
+        start = time.perf_counter()
+        seed(db.engine, args.projects, args.tasks, seed=args.seed, skew=args.skew)
+        print(
+            f"Seeded {args.projects} projects and {args.tasks} tasks "
+            f"in {time.perf_counter() - start:.1f}s."
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,41 @@
 let timers = {};
 let projects = [];
-let projectIdCounter = 0;
-let taskIdCounter = 0;
 let currentProjectId = null;
 
+const HEARTBEAT_INTERVAL = 15000;
+
+// Escape text before it is interpolated into HTML; names and descriptions
+// can come from other users through the change feed
+function escapeHTML(value) {
+  const element = document.createElement("div");
+  element.textContent = value === null || value === undefined ? "" : value;
+  return element.innerHTML;
+}
+
+// Send a timer action for a task to the server
+function sendTimerEvent(taskId, action, method = "POST") {
+  return fetch(`/${action}/${taskId}`, { method: method })
+    .then((response) => response.json())
+    .catch((error) => {
+      console.error("Error:", error);
+      return null;
+    });
+}
+
 function startTimer(taskId) {
   if (!timers[taskId]) {
     timers[taskId] = { startTime: Date.now(), elapsedTime: 0, interval: null };
-    timers[taskId].interval = setInterval(() => updateTimer(taskId), 1000);
   } else if (!timers[taskId].interval) {
     timers[taskId].startTime = Date.now() - timers[taskId].elapsedTime;
-    timers[taskId].interval = setInterval(() => updateTimer(taskId), 1000);
+  } else {
+    return;
   }
+  timers[taskId].interval = setInterval(() => updateTimer(taskId), 1000);
+  timers[taskId].heartbeat = setInterval(
+    () => sendTimerEvent(taskId, "timer_heartbeat"),
+    HEARTBEAT_INTERVAL
+  );
+  sendTimerEvent(taskId, "start_timer");
 
   moveTaskToBoard(taskId, "ongoing");
 }
@@ -19,8 +43,10 @@ function startTimer(taskId) {
 function pauseTimer(taskId) {
   if (timers[taskId] && timers[taskId].interval) {
     clearInterval(timers[taskId].interval);
+    clearInterval(timers[taskId].heartbeat);
     timers[taskId].elapsedTime = Date.now() - timers[taskId].startTime;
     timers[taskId].interval = null;
+    sendTimerEvent(taskId, "pause_timer");
 
     moveTaskToBoard(taskId, "paused");
   }
@@ -29,6 +55,7 @@ function pauseTimer(taskId) {
 function stopTimer(taskId) {
   if (timers[taskId]) {
     clearInterval(timers[taskId].interval);
+    clearInterval(timers[taskId].heartbeat);
     const totalElapsedTime = Math.floor(
       (Date.now() - timers[taskId].startTime) / 1000 / 60
     ); // Convert milliseconds to minutes
@@ -36,6 +63,17 @@ function stopTimer(taskId) {
     const currentLoggedTime = parseInt(timeLoggedElement.textContent, 10);
     timeLoggedElement.textContent = currentLoggedTime + totalElapsedTime;
 
+    // Prefer the total logged on the server once it answers
+    const wasRunning = timers[taskId].interval !== null;
+    const request = wasRunning
+      ? sendTimerEvent(taskId, "stop_timer")
+      : sendTimerEvent(taskId, "task_time", "GET");
+    request.then((data) => {
+      if (data && data.seconds !== undefined) {
+        timeLoggedElement.textContent = Math.floor(data.seconds / 60);
+      }
+    });
+
     // Clear timer display
     document.getElementById(`timer-display-${taskId}`).textContent = "";
 
@@ -76,6 +114,13 @@ function drop(ev) {
 }
 
 function addTaskToDOM(projectId, taskId, taskName, taskDescription) {
+  taskId = Number(taskId);
+  const column = document.getElementById(`not-yet-started-${projectId}`);
+  // Skip tasks already shown and tasks of projects that aren't open
+  if (!column || document.getElementById(`task-${taskId}`)) {
+    return;
+  }
+
   const taskElement = document.createElement("div");
   taskElement.classList.add("task");
   taskElement.id = `task-${taskId}`;
@@ -83,7 +128,7 @@ function addTaskToDOM(projectId, taskId, taskName, taskDescription) {
   taskElement.ondragstart = drag;
 
   taskElement.innerHTML = `
-        <span>${taskName} - <span id="time-logged-${taskId}">0</span> minutes</span>
+        <span>${escapeHTML(taskName)} - <span id="time-logged-${taskId}">0</span> minutes</span>
         <div class="timer-controls">
             <button class="btn timer-btn" onclick="startTimer(${taskId})">Start</button>
             <button class="btn timer-btn" onclick="pauseTimer(${taskId})">Pause</button>
@@ -92,70 +137,113 @@ function addTaskToDOM(projectId, taskId, taskName, taskDescription) {
         <div class="timer-display" id="timer-display-${taskId}"></div>
     `;
 
-  document
-    .getElementById(`not-yet-started-${projectId}`)
-    .appendChild(taskElement);
+  column.appendChild(taskElement);
 }
 
+let pendingTasks = [];
+let pendingTasksTimeout = null;
+
 function addTask(projectId, taskName, taskDescription) {
-  const taskId = taskIdCounter++; // Unique ID for the task
-  addTaskToDOM(projectId, taskId, taskName, taskDescription);
+  // Queue the task; tasks added close together are saved in one request
+  pendingTasks.push({
+    "task-name": taskName,
+    "task-description": taskDescription,
+    "project-id": projectId,
+  });
+  if (pendingTasksTimeout === null) {
+    pendingTasksTimeout = setTimeout(flushPendingTasks, 50);
+  }
+}
 
-  // Send AJAX request to save task to database
-  fetch("/add_task", {
+function flushPendingTasks() {
+  const tasks = pendingTasks;
+  pendingTasks = [];
+  pendingTasksTimeout = null;
+
+  // Send AJAX request to save the queued tasks to database
+  fetch("/add_tasks", {
     method: "POST",
     headers: {
       "Content-Type": "application/json",
     },
-    body: JSON.stringify({
-      "task-name": taskName,
-      "task-description": taskDescription,
-      "project-id": projectId,
-    }),
+    body: JSON.stringify(tasks),
   })
     .then((response) => response.json())
     .then((data) => {
-      console.log("Task saved:", data);
+      // Show saved tasks under the ids the database gave them
+      data.ids.forEach((id, index) => {
+        if (id !== null) {
+          const task = tasks[index];
+          addTaskToDOM(
+            task["project-id"],
+            id,
+            task["task-name"],
+            task["task-description"]
+          );
+        }
+      });
+      console.log("Tasks saved:", data);
     })
     .catch((error) => {
       console.error("Error:", error);
     });
 }
 
+function findProjectListItem(projectId) {
+  return document.querySelector(
+    `.project-list-item[data-project-id="${projectId}"]`
+  );
+}
+
 function addProjectToDOM(projectId, name, description) {
-  const projectListItem = document.createElement("div");
-  projectListItem.classList.add("project-list-item");
-  projectListItem.id = `project-list-item-${projectId}`;
-  projectListItem.onclick = () => displayProject(projectId);
+  projectId = Number(projectId);
+  // The project may already be listed, e.g. by the change feed
+  if (findProjectListItem(projectId)) {
+    return;
+  }
+  if (!projects.some((proj) => proj.id === projectId)) {
+    projects.push({ id: projectId, name: name, description: description });
+  }
 
-  projectListItem.innerHTML = `
-        <h3>${name}</h3>
-         <button class="delete-btn" data-project-id="${projectId}">Delete Project</button>
+  // Same markup as the server-rendered templates/project_list.html
+  const projectItem = document.createElement("div");
+  projectItem.classList.add("project-item");
+  projectItem.innerHTML = `
+        <div class="project-list-item" data-project-id="${projectId}">
+            <h3>${escapeHTML(name)}</h3>
+            <span class="task-count">0 tasks</span>
+            <button class="delete-btn" data-project-id="${projectId}">Delete Project</button>
+        </div>
     `;
 
+  const projectListItem = projectItem.querySelector(".project-list-item");
+  projectListItem.dataset.description = description || "";
+  projectListItem.onclick = () => displayProject(projectId);
+
   // Add an event listener for the delete button
   const deleteButton = projectListItem.querySelector(".delete-btn");
   deleteButton.addEventListener("click", (event) => {
     event.stopPropagation(); // Prevent click event from bubbling to projectListItem
     const projectIdToDelete = event.target.dataset.projectId;
     deleteProject(projectIdToDelete); // Call your delete function here
-    // Optionally, remove the projectListItem from DOM after deletion
-    projectListItem.remove();
   });
 
-  document.getElementById("project-list").appendChild(projectListItem);
+  document.getElementById("project-list").appendChild(projectItem);
 
   if (currentProjectId === null) {
     displayProject(projectId);
   }
 }
 
-function addProject(name, description) {
-  const projectId = projectIdCounter++; // Unique ID for the project
-  projects.push({ id: projectId, name: name, description: description });
-
-  addProjectToDOM(projectId, name, description);
+function bumpTaskCount(projectId) {
+  const item = findProjectListItem(projectId);
+  const taskCount = item && item.querySelector(".task-count");
+  if (taskCount) {
+    taskCount.textContent = `${parseInt(taskCount.textContent, 10) + 1} tasks`;
+  }
+}
 
+function addProject(name, description) {
   // Send AJAX request to save project to database
   fetch("/add_project", {
     method: "POST",
@@ -169,6 +257,7 @@ function addProject(name, description) {
   })
     .then((response) => response.json())
     .then((data) => {
+      addProjectToDOM(data.project_id, name, description);
       console.log("Project saved:", data);
     })
     .catch((error) => {
@@ -177,14 +266,15 @@ function addProject(name, description) {
 }
 
 function displayProject(projectId) {
+  projectId = Number(projectId);
   currentProjectId = projectId;
 
   const project = projects.find((proj) => proj.id === projectId);
   const currentProjectContainer = document.getElementById("current-project");
   currentProjectContainer.innerHTML = `
         <button id="add-task-btn" class="btn top-right-btn">Add Task</button>
-        <h3>${project.name}</h3>
-        <p>${project.description}</p>
+        <h3>${escapeHTML(project.name)}</h3>
+        <p>${escapeHTML(project.description)}</p>
         <div class="board">
             <div class="column" id="not-yet-started-${projectId}" ondrop="drop(event)" ondragover="allowDrop(event)">
                 <h3>Not Yet Started</h3>
@@ -273,6 +363,12 @@ document.addEventListener("DOMContentLoaded", () => {
 
   // Event listener for dynamically created project list items
   document.querySelectorAll(".project-list-item").forEach((item) => {
+    projects.push({
+      id: Number(item.dataset.projectId),
+      name: item.querySelector("h3").textContent,
+      description: item.dataset.description,
+    });
+
     item.addEventListener("click", () => {
       const projectId = item.getAttribute("data-project-id");
       displayProject(projectId);
@@ -299,9 +395,7 @@ function deleteProject(projectId) {
       .then((response) => {
         if (response.ok) {
           // Remove project item from UI
-          document
-            .querySelector(`.project-list-item[data-project-id="${projectId}"]`)
-            .remove();
+          removeProjectFromDOM(projectId);
           console.log(`Project ${projectId} deleted successfully.`);
         } else {
           console.error(`Failed to delete project ${projectId}.`);
@@ -332,3 +426,47 @@ function openModal(modalId) {
 function closeModal(modalId) {
   document.getElementById(modalId).style.display = "none";
 }
+
+function removeProjectFromDOM(projectId) {
+  projectId = Number(projectId);
+  const item = findProjectListItem(projectId);
+  if (item) {
+    (item.closest(".project-item") || item).remove();
+  }
+  projects = projects.filter((proj) => proj.id !== projectId);
+  if (currentProjectId === projectId) {
+    currentProjectId = null;
+    document.getElementById("current-project").innerHTML = "";
+  }
+}
+
+// Apply other users' changes as they happen instead of reloading
+function subscribeToChanges() {
+  const since = document.getElementById("project-list").dataset.changeSeq;
+  // EventSource resumes from the last event id by itself after a reconnect
+  const source = new EventSource(`/events?since=${since}`);
+
+  source.addEventListener("project_added", (event) => {
+    const project = JSON.parse(event.data);
+    addProjectToDOM(project.id, project.name, project.description);
+  });
+
+  source.addEventListener("task_added", (event) => {
+    const task = JSON.parse(event.data);
+    addTaskToDOM(task.project_id, task.id, task.name, task.description);
+    // Every task, ours included, is counted once here as its change arrives
+    bumpTaskCount(task.project_id);
+  });
+
+  source.addEventListener("project_deleted", (event) => {
+    removeProjectFromDOM(JSON.parse(event.data).id);
+  });
+
+  // Too much was missed to replay; start over from a fresh page
+  source.addEventListener("reset", () => {
+    source.close();
+    window.location.reload();
+  });
+}
+
+document.addEventListener("DOMContentLoaded", subscribeToChanges);
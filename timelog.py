@@ -0,0 +1,70 @@
+import logging
+import threading
+
+from background import BackgroundThread
+
+log = logging.getLogger(__name__)
+
+
+class HeartbeatBuffer:
+    """Collects timer heartbeats in memory and flushes them in batches.
+
+    Only the latest heartbeat per task is kept. A daemon thread hands the
+    pending heartbeats to ``flush_callback`` every ``interval`` seconds, so a
+    burst of heartbeats costs one write transaction instead of one each.
+    """
+
+    def __init__(self, flush_callback, interval=10):
+        self.flush_callback = flush_callback
+        self.interval = interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._thread = BackgroundThread(self._run, "heartbeat-flusher")
+        self._stopped = threading.Event()
+
+    def add(self, task_id, at):
+        with self._lock:
+            self._pending[task_id] = at
+        self.start()
+
+    def pop(self, task_id):
+        """Remove and return the pending heartbeat for one task, if any."""
+        with self._lock:
+            return self._pending.pop(task_id, None)
+
+    def drain(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def flush(self):
+        pending = self.drain()
+        if not pending:
+            return
+        try:
+            self.flush_callback(pending)
+        except Exception:
+            self.requeue(pending)
+            raise
+
+    def requeue(self, heartbeats):
+        """Put back a batch that failed to flush, keeping any newer heartbeats."""
+        with self._lock:
+            for task_id, at in heartbeats.items():
+                if task_id not in self._pending or self._pending[task_id] < at:
+                    self._pending[task_id] = at
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self.flush()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.flush()
+            except Exception:
+                # e.g. "database is locked"; the batch is retried next round
+                log.exception("Failed to flush timer heartbeats")